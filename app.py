@@ -10,10 +10,11 @@ import json
 import atexit
 import functools
 import logging
+import os
 from database import (
-    get_tags, add_tag, get_uploaded_files, load_transactions,
-    update_transaction_note, update_transaction_tags, get_tag_name_to_id_mapping,
-    close_thread_connection
+    DB_PATH, init_db, migrate_db, get_tags, add_tag, get_uploaded_files, get_uploaded_files_version, load_transactions,
+    update_transaction_note, update_transaction_tags, get_tag_name_to_id_mapping, get_tag_options,
+    close_all_connections
 )
 from file_import import process_uploaded_files
 
@@ -25,8 +26,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Register cleanup function for the main thread
-atexit.register(close_thread_connection)
+# Create (or migrate) the schema once at startup so the queries below can trust it
+if not os.path.exists(DB_PATH):
+    init_db()
+else:
+    migrate_db()
+
+# Close the pooled database connections on shutdown
+atexit.register(close_all_connections)
 
 def debug_callback(func):
     """Simple decorator to log callback name when executed."""
@@ -36,16 +43,6 @@ def debug_callback(func):
         return func(*args, **kwargs)
     return wrapper
 
-# Add cleanup for each callback
-def cleanup_after_callback(func):
-    """Decorator to clean up database connections after callbacks."""
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        finally:
-            close_thread_connection()
-    return wrapper
-
 # Initialize the Dash app
 app = dash.Dash(
     __name__,
@@ -216,7 +213,7 @@ app.layout = dbc.Container([
                         html.Label("Tags"),
                         dcc.Dropdown(
                             id='new-transaction-tags',
-                            options=[{'label': name, 'value': id} for name, id in get_tag_name_to_id_mapping().items()],
+                            options=get_tag_options(),
                             multi=True,
                             clearable=True
                         )
@@ -269,7 +266,6 @@ def toggle_custom_format(format_type):
     suppress_callback_exceptions=True
 )
 @debug_callback
-@cleanup_after_callback
 def update_data(contents_list, filename_list, format_type, custom_date_col, custom_desc_col, custom_amount_col, sort_state, filter_state, date_range_state):
     if not contents_list:
         # If no new data uploaded, load from database
@@ -280,8 +276,8 @@ def update_data(contents_list, filename_list, format_type, custom_date_col, cust
         # Apply sorting
         df = df.sort(sort_state['column'], descending=not sort_state['ascending'])
 
-        # Always refresh the uploaded files table
-        uploaded_files_table = create_uploaded_files_table()
+        # Rebuilt only when the uploaded files have changed since the last render
+        uploaded_files_table = create_uploaded_files_table(get_uploaded_files_version())
 
         if df.is_empty():
             return None, "", uploaded_files_table, html.Div("No transaction found")
@@ -299,7 +295,7 @@ def update_data(contents_list, filename_list, format_type, custom_date_col, cust
     )
 
     # Create the uploaded files table
-    uploaded_files_table = create_uploaded_files_table()
+    uploaded_files_table = create_uploaded_files_table(get_uploaded_files_version())
 
     # Load transactions for the table with current sort
     df = load_transactions()
@@ -342,29 +338,35 @@ def load_initial_data(active_tab, sort_state, filter_state, date_range_state):
 
     return df.to_dicts(), create_transaction_table(df, sort_state, filter_state, date_range_state)
 
-def create_uploaded_files_table():
-    """Create a table showing uploaded files."""
-    print("Creating uploaded files table...")
-    df = get_uploaded_files()
-    print(f"Got uploaded files from database: {len(df)} files")
-    print(f"Files: {df.to_dicts() if not df.is_empty() else 'No files'}")
+@functools.lru_cache(maxsize=1)
+def create_uploaded_files_table(version):
+    """Create a table showing uploaded files.
 
-    if df.is_empty():
+    The version argument is only used as the cache key, so the table is rebuilt
+    only when the uploaded files list has changed.
+    """
+    logger.debug("Creating uploaded files table...")
+    files = get_uploaded_files()
+    logger.debug(f"Got uploaded files from database: {len(files)} files")
+
+    if not files:
         return html.Div("No files uploaded yet")
 
-    df = df.with_columns([
-        pl.col('upload_date').cast(pl.Datetime).dt.strftime('%Y-%m-%d %H:%M:%S').alias('upload_date'),
-        pl.col('sha_256').str.slice(0, 8).str.concat('...').alias('sha_256')
-    ])
+    columns = ['filename', 'upload_date', 'transaction_count', 'sha_256']
+    table_header = [html.Thead(html.Tr([html.Th(column) for column in columns]))]
+    table_body = [html.Tbody([
+        html.Tr([
+            html.Td(row['filename']),
+            html.Td(row['upload_date']),
+            html.Td(row['transaction_count']),
+            html.Td(f"{row['sha_256'][:8]}...")
+        ])
+        for row in files
+    ])]
 
     return html.Div([
         html.H5("Uploaded Files", className="mt-4"),
-        dbc.Table.from_dataframe(
-            df.to_pandas(),  # Convert to pandas for dbc.Table compatibility
-            striped=True,
-            bordered=True,
-            hover=True
-        )
+        dbc.Table(table_header + table_body, striped=True, bordered=True, hover=True)
     ])
 
 @callback(
@@ -411,9 +413,9 @@ def update_tags_table(active_tab):
     if active_tab != "tags":
         raise PreventUpdate
 
-    df = get_tags()
+    tags = get_tags()
 
-    if df.is_empty():
+    if not tags:
         return html.Div("No tags found")
 
     # Format the table with color swatches
@@ -427,7 +429,7 @@ def update_tags_table(active_tab):
     ]
 
     rows = []
-    for _, row in df.iter_rows(named=True):
+    for row in tags:
         color_swatch = html.Td(
             html.Div(
                 style={
@@ -443,7 +445,7 @@ def update_tags_table(active_tab):
             color_swatch,
             html.Td(row['name']),
             html.Td(row['description']),
-            html.Td(row['created_at'].strftime('%Y-%m-%d %H:%M'))
+            html.Td(row['created_at'][:16])  # 'YYYY-MM-DD HH:MM' from SQLite's timestamp text
         ]))
 
     table_body = [html.Tbody(rows)]
@@ -611,6 +613,7 @@ def create_transaction_table(df, sort_state, filter_state, date_range_state):
 
     # Get tag name to ID mapping
     tag_name_to_id = get_tag_name_to_id_mapping()
+    tag_options = get_tag_options()
 
     # Helper function to create sort indicator
     def get_sort_indicator(column):
@@ -655,13 +658,13 @@ def create_transaction_table(df, sort_state, filter_state, date_range_state):
     rows = []
     for row in df.iter_rows(named=True):
         # Get current tags for this transaction
-        current_tags = [tag.strip() for tag in str(row['Tags']).split(',') if tag.strip()]
+        current_tags = row['Tags'] or []
         # Convert tag names to IDs
         current_tag_ids = [tag_name_to_id.get(tag) for tag in current_tags if tag in tag_name_to_id]
 
         tag_dropdown = dcc.Dropdown(
             id={'type': 'tag-filter', 'index': row['id']},
-            options=[{'label': name, 'value': id} for name, id in tag_name_to_id.items()],
+            options=tag_options,
             value=current_tag_ids,
             multi=True,
             clearable=True,
@@ -717,7 +720,7 @@ def create_transaction_table(df, sort_state, filter_state, date_range_state):
 @debug_callback
 def filter_transactions(search_text, sort_state, date_range_state, filter_state):
     # Update filter state
-    filter_state = {'text': search_text or '', 'column': 'description'}
+    filter_state = {'text': search_text or '', 'column': 'Description'}
 
     # Load data with current sort and search
     df = load_transactions()
@@ -2,83 +2,253 @@ import sqlite3
 import os
 import time
 import json
+import re
 import polars as pl
 from datetime import datetime, timedelta
 import threading
-from typing import Dict, Any
+import queue
+from contextlib import contextmanager
+from typing import Any, Dict, Tuple
+from collections import OrderedDict
 import logging
 
+logger = logging.getLogger(__name__)
+
 # Database setup
 DB_PATH = os.environ.get('HM_DB_PATH', 'transactions.db')
 
-# Thread-local storage for database connections
-thread_local = threading.local()
+# File hash recorded against transactions that were entered by hand
+MANUAL_ENTRY_SHA = 'manual_entry'
+
+# Transaction dates are stored as ISO-8601 with a time component
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
 # Cache configuration
 CACHE_TTL = 300  # 5 minutes in seconds
+CACHE_MAX_ENTRIES = 64
+# One lock guards every structural change to the cache (insert, reorder, evict); hits read without locking
 _cache_lock = threading.Lock()
-_cache_timestamps: Dict[str, float] = {}
-_cache: Dict[str, Any] = {}
+# name -> (timestamp, data), evicted least-recently-updated first
+_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+# Row ids changed since a cached frame was built; patched in on the next read
+DIRTY_REBUILD_FRACTION = 0.1  # above this share of changed rows, rebuild from scratch
+_dirty: Dict[str, set] = {}
+
+# Bumped whenever the uploaded_files table changes, so callers can memoize views of it.
+# Every such change invalidates the 'uploaded_files' cache (or the whole cache), which bumps it.
+_uploaded_files_version = 0
 
 def _invalidate_cache(cache_name: str = None):
     """Invalidate specific cache or all caches if no name provided."""
+    global _uploaded_files_version
     with _cache_lock:
+        if cache_name is None or cache_name == 'uploaded_files':
+            _uploaded_files_version += 1
         if cache_name:
-            _cache_timestamps.pop(cache_name, None)
             _cache.pop(cache_name, None)
-            # If invalidating transactions cache, also invalidate all sorted transaction caches
-            if cache_name == 'transactions':
-                # Remove all cache keys that start with 'transactions_sort_'
-                keys_to_remove = [k for k in _cache_timestamps.keys() if k.startswith('transactions_sort_')]
-                for k in keys_to_remove:
-                    _cache_timestamps.pop(k)
-                    _cache.pop(k)
+            _dirty.pop(cache_name, None)
         else:
-            _cache_timestamps.clear()
             _cache.clear()
+            _dirty.clear()
 
-def _is_cache_valid(cache_name: str) -> bool:
-    """Check if cache is still valid based on TTL."""
+def _mark_dirty(cache_name: str, keys):
+    """Record changed row ids for a cached frame instead of dropping the whole frame."""
     with _cache_lock:
-        timestamp = _cache_timestamps.get(cache_name)
-        if timestamp is None:
-            return False
-        return (time.time() - timestamp) < CACHE_TTL
+        if cache_name in _cache:
+            _dirty.setdefault(cache_name, set()).update(keys)
 
-def _update_cache(cache_name: str, data: Any):
-    """Update the cache with new data."""
+def _take_dirty(cache_name: str) -> set:
+    """Remove and return the changed row ids recorded for a cached frame."""
     with _cache_lock:
-        _cache[cache_name] = data
-        _cache_timestamps[cache_name] = time.time()
+        return _dirty.pop(cache_name, set())
+
+def _try_get(cache_name: str) -> Tuple[bool, Any]:
+    """Look up a cache entry, returning (hit, data) where hit means it is still within its TTL.
+
+    Entries are replaced as whole tuples, so a single dict lookup is enough and no lock is taken.
+    """
+    entry = _cache.get(cache_name)
+    if entry is None:
+        return False, None
+    timestamp, data = entry
+    if (time.time() - timestamp) >= CACHE_TTL:
+        return False, None
+    return True, data
 
-def _get_cache(cache_name: str):
-    """Get the cache for a given name."""
+def _update_cache(cache_name: str, data: Any):
+    """Update the cache with new data."""
     with _cache_lock:
-        return _cache.get(cache_name, None)
+        _cache[cache_name] = (time.time(), data)
+        _cache.move_to_end(cache_name)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+# Per-connection PRAGMAs: WAL removes the fsync from every commit and lets readers run alongside the writer
+# journal_mode is persistent in the database file, so only the writer sets it (see _write_conn)
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA wal_autocheckpoint=1000',
+    'PRAGMA busy_timeout=30000',
+    'PRAGMA foreign_keys=ON',
+)
+
+# Statements shared by the mutation helpers, kept as constants so sqlite3's statement cache reuses them
+SQL_INSERT_TAG = '''
+    INSERT INTO tags (name, description, color)
+    VALUES (?, ?, ?)
+'''
+SQL_UPDATE_TAG = '''
+    UPDATE tags
+    SET name = ?, description = ?, color = ?
+    WHERE id = ?
+'''
+SQL_INSERT_FILE = '''
+    INSERT INTO uploaded_files (filename, sha_256, transaction_count)
+    VALUES (?, ?, ?)
+'''
+SQL_INSERT_MANUAL_FILE = '''
+    INSERT OR IGNORE INTO uploaded_files (filename, sha_256, transaction_count)
+    VALUES ('Manual entry', ?, 0)
+'''
+SQL_INSERT_TX_MANUAL = '''
+    INSERT INTO transactions (date, description, amount, notes, file_sha_256)
+    VALUES (?, ?, ?, ?, ?)
+'''
+SQL_SELECT_TAG_IDS = 'SELECT id AS tag_id, name AS tag_name FROM tags'
+SQL_SELECT_FILE_TX_IDS = 'SELECT id FROM transactions WHERE file_sha_256 = ? ORDER BY id DESC LIMIT ?'
+SQL_SELECT_TX_TAG_IDS = 'SELECT tag_id FROM transaction_tags WHERE transaction_id = ?'
+SQL_INSERT_TX_TAG = '''
+    INSERT INTO transaction_tags (transaction_id, tag_id)
+    VALUES (?, ?)
+'''
+SQL_DELETE_TX_TAG = 'DELETE FROM transaction_tags WHERE transaction_id = ? AND tag_id = ?'
+SQL_UPDATE_TX_NOTE = '''
+    UPDATE transactions
+    SET notes = ?
+    WHERE id = ?
+'''
+SQL_DELETE_TAG = 'DELETE FROM tags WHERE id = ?'
+SQL_DELETE_TXS = 'DELETE FROM transactions WHERE id IN (SELECT value FROM json_each(?))'
+
+# Readers get a pooled query-only connection; all writes go through one writer connection
+READ_POOL_SIZE = os.cpu_count() or 4
+_read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+_read_pool_lock = threading.Lock()
+_read_pool_created = 0
+_writer_lock = threading.RLock()
+_writer_connection = None
 
 def get_db_connection(timeout=30):
-    """Get a database connection for the current thread."""
-    if not hasattr(thread_local, 'connection'):
-        thread_local.connection = sqlite3.connect(DB_PATH, timeout=timeout)
-        thread_local.connection.row_factory = sqlite3.Row
-    return thread_local.connection
-
-def close_thread_connection():
-    """Close the database connection for the current thread."""
-    if hasattr(thread_local, 'connection'):
-        thread_local.connection.close()
-        del thread_local.connection
+    """Open a new database connection with the standard PRAGMAs applied."""
+    conn = sqlite3.connect(DB_PATH, timeout=timeout, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@contextmanager
+def _read_conn():
+    """Check a read-only connection out of the pool, returning it on exit."""
+    global _read_pool_created
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        with _read_pool_lock:
+            can_create = _read_pool_created < READ_POOL_SIZE
+            if can_create:
+                _read_pool_created += 1
+        if can_create:
+            conn = get_db_connection()
+            conn.execute('PRAGMA query_only=1')
+        else:
+            conn = _read_pool.get()
+    try:
+        yield conn
+    finally:
+        _read_pool.put(conn)
+
+@contextmanager
+def _write_conn():
+    """Hold the writer lock and yield the single writer connection."""
+    global _writer_connection
+    with _writer_lock:
+        if _writer_connection is None:
+            _writer_connection = get_db_connection()
+            _writer_connection.execute('PRAGMA journal_mode=WAL')
+        yield _writer_connection
 
 def close_all_connections():
-    """Close all thread-local connections."""
-    # This is a no-op since connections are managed per-thread
-    pass
+    """Close the pooled read connections and the writer connection."""
+    global _read_pool_created, _writer_connection
+    with _read_pool_lock:
+        while True:
+            try:
+                _read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        _read_pool_created = 0
+    with _writer_lock:
+        if _writer_connection is not None:
+            _writer_connection.close()
+            _writer_connection = None
+
+# Amounts are stored as INTEGER hundredths (cents) so they sum exactly and pack smaller
+TRANSACTIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TIMESTAMP NOT NULL,
+        description TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        file_sha_256 TEXT NOT NULL,
+        notes TEXT,
+        tags_json TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (file_sha_256) REFERENCES uploaded_files(sha_256)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    )
+'''
+
+TRANSACTION_TAGS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        transaction_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (transaction_id, tag_id),
+        FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+            ON DELETE CASCADE ON UPDATE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    )
+'''
+
+# transactions.tags_json materializes each transaction's tag names as a JSON array, kept
+# in step by triggers so loading transactions needs no join or aggregation
+TAGS_JSON_REFRESH = '''
+    UPDATE transactions SET tags_json = (
+        SELECT json_group_array(tg.name)
+        FROM transaction_tags tt
+        JOIN tags tg ON tt.tag_id = tg.id
+        WHERE tt.transaction_id = transactions.id
+    )
+'''
+TAG_TRIGGERS = (
+    ('transaction_tags', 'CREATE TRIGGER IF NOT EXISTS trg_tt_ai AFTER INSERT ON transaction_tags BEGIN'
+        + TAGS_JSON_REFRESH + 'WHERE id = NEW.transaction_id; END'),
+    ('transaction_tags', 'CREATE TRIGGER IF NOT EXISTS trg_tt_ad AFTER DELETE ON transaction_tags BEGIN'
+        + TAGS_JSON_REFRESH + 'WHERE id = OLD.transaction_id; END'),
+    ('transaction_tags', 'CREATE TRIGGER IF NOT EXISTS trg_tt_au AFTER UPDATE ON transaction_tags BEGIN'
+        + TAGS_JSON_REFRESH + 'WHERE id IN (OLD.transaction_id, NEW.transaction_id); END'),
+    ('tags', 'CREATE TRIGGER IF NOT EXISTS trg_tags_au AFTER UPDATE OF name ON tags BEGIN'
+        + TAGS_JSON_REFRESH + 'WHERE id IN (SELECT transaction_id FROM transaction_tags WHERE tag_id = NEW.id); END'),
+)
 
 def init_db(table='all'):
     """Initialize the database and create specified table(s) if they don't exist."""
-    conn = None
-    try:
-        conn = get_db_connection()
+    with _write_conn() as conn:
         c = conn.cursor()
 
         tables_to_create = []
@@ -105,30 +275,10 @@ def init_db(table='all'):
             ''', 'uploaded_files'))
 
         if table == 'all' or table == 'transactions':
-            tables_to_create.append(('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TIMESTAMP NOT NULL,
-                    description TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    file_sha_256 TEXT NOT NULL,
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (file_sha_256) REFERENCES uploaded_files(sha_256)
-                )
-            ''', 'transactions'))
+            tables_to_create.append((TRANSACTIONS_TABLE_SQL.format(name='transactions'), 'transactions'))
 
         if table == 'all' or table == 'transaction_tags':
-            tables_to_create.append(('''
-                CREATE TABLE IF NOT EXISTS transaction_tags (
-                    transaction_id INTEGER NOT NULL,
-                    tag_id INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (transaction_id, tag_id),
-                    FOREIGN KEY (transaction_id) REFERENCES transactions(id),
-                    FOREIGN KEY (tag_id) REFERENCES tags(id)
-                )
-            ''', 'transaction_tags'))
+            tables_to_create.append((TRANSACTION_TAGS_TABLE_SQL.format(name='transaction_tags'), 'transaction_tags'))
 
         for create_sql, table_name in tables_to_create:
             c.execute(create_sql)
@@ -154,287 +304,515 @@ def init_db(table='all'):
                 ('Subscriptions', 'Streaming services, software, and memberships', '#9C27B0'),
                 ('Insurance', 'Health, auto, home, and other insurance premiums', '#2196F3')
             ]
-            c.executemany('''
-                INSERT OR IGNORE INTO tags (name, description, color)
-                VALUES (?, ?, ?)
-            ''', default_tags)
+            # One multi-row statement instead of a step per tag
+            c.execute(
+                'INSERT OR IGNORE INTO tags (name, description, color) VALUES '
+                + ', '.join(['(?, ?, ?)'] * len(default_tags)),
+                [value for tag in default_tags for value in tag]
+            )
             print("Inserted default tags")
 
+        # Indexes backing the transaction joins, grouping and ordering
+        indexes_to_create = []
+        if table == 'all' or table == 'transactions':
+            indexes_to_create += [
+                'CREATE INDEX IF NOT EXISTS idx_tx_sha ON transactions(file_sha_256)',
+                'CREATE INDEX IF NOT EXISTS idx_tx_date ON transactions(date DESC)',
+            ]
+        if table == 'all' or table == 'transaction_tags':
+            indexes_to_create += [
+                'CREATE INDEX IF NOT EXISTS idx_tt_tid ON transaction_tags(transaction_id)',
+                # Covers tag -> transaction lookups (tag deletes, cascades) without touching the table
+                'CREATE INDEX IF NOT EXISTS idx_tt_tag_tx ON transaction_tags(tag_id, transaction_id)',
+            ]
+        for index_sql in indexes_to_create:
+            c.execute(index_sql)
+
+        # (Re)create the tag triggers on whichever of their tables exist; dropping a table drops its triggers
+        existing_tables = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for on_table, trigger_sql in TAG_TRIGGERS:
+            if on_table in existing_tables:
+                c.execute(trigger_sql)
+
         conn.commit()
-    finally:
-        if conn:
-            conn.close()
 
-def reset_database(table='all'):
-    """Reset specified table(s) by dropping and recreating them.
-    WARNING: This will delete all data in the specified table(s)!
-    """
-    conn = None
-    try:
-        conn = get_db_connection()
+        # Refresh the planner statistics so the new indexes get used
+        c.execute('ANALYZE')
+
+def drop_tables(table='all'):
+    """Drop the specified table(s) on the shared writer connection."""
+    with _write_conn() as conn:
         c = conn.cursor()
 
-        # Drop specified tables
+        # Drop dependent tables first so the foreign keys never dangle
         if table == 'all':
             tables = ['transaction_tags', 'transactions', 'uploaded_files', 'tags']
         else:
             tables = [table]
 
-        for t in tables:
-            c.execute(f'DROP TABLE IF EXISTS {t}')
-            print(f"Dropped table: {t}")
+        existing_tables = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
 
-        conn.commit()
+        # Foreign keys are off while dropping, otherwise the implicit DELETE of a DROP TABLE would
+        # cascade into the tables being kept (dropping uploaded_files would empty transactions)
+        conn.execute('PRAGMA foreign_keys=OFF')
+        try:
+            with conn:
+                # Tag links are meaningless without their transaction or tag, so clear them first, while
+                # the tables their triggers refresh from still exist
+                if ('transaction_tags' in existing_tables and 'transaction_tags' not in tables
+                        and {'transactions', 'tags'} & set(tables)):
+                    c.execute('DELETE FROM transaction_tags')
+
+                for t in tables:
+                    c.execute(f'DROP TABLE IF EXISTS {t}')
+                    print(f"Dropped table: {t}")
+
+                # Dropping a table fires no triggers, so clear the materialized tags of any transactions left behind
+                if 'transactions' in existing_tables - set(tables) and {'transaction_tags', 'tags'} & set(tables):
+                    c.execute("UPDATE transactions SET tags_json = '[]'")
+        finally:
+            conn.execute('PRAGMA foreign_keys=ON')
+    _invalidate_cache()
+
+def _rebuild_table(conn, table, create_sql, copy_sql):
+    """Recreate a table from create_sql, filling it with copy_sql run against the old table.
+
+    SQLite can't alter a column's type or constraints in place, so the table is rebuilt under a
+    temporary name and renamed over the old one. Foreign keys are off meanwhile so dropping the old
+    table doesn't cascade to its dependants, and legacy renaming stops the tag triggers from being
+    checked against the missing table.
+    """
+    new_table = f'{table}_new'
+    conn.execute('PRAGMA foreign_keys=OFF')
+    conn.execute('PRAGMA legacy_alter_table=ON')
+    try:
+        with conn:
+            conn.execute('BEGIN')
+            conn.execute(create_sql.format(name=new_table))
+            conn.execute(copy_sql.format(name=new_table))
+            conn.execute(f'DROP TABLE {table}')
+            conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
     finally:
-        if conn:
-            conn.close()
+        conn.execute('PRAGMA legacy_alter_table=OFF')
+        conn.execute('PRAGMA foreign_keys=ON')
+
+# Indexes created by earlier versions that no query uses any more
+OBSOLETE_INDEXES = (
+    'idx_tx_desc',  # description search runs in memory, not in SQL
+    'idx_tt_tagid',  # superseded by the covering idx_tt_tag_tx
+)
+
+# Every table of the schema, parents before the tables referencing them
+SCHEMA_TABLES = ('tags', 'uploaded_files', 'transactions', 'transaction_tags')
+
+def migrate_db():
+    """Bring an existing database up to the current schema."""
+    with _write_conn() as conn:
+        # Recreate any table deleted since (e.g. with database_main.py delete); only a table created
+        # here gets seeded, so default tags the user removed don't come back
+        existing_tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in SCHEMA_TABLES:
+            if table not in existing_tables:
+                init_db(table)
+
+        with conn:
+            for index_name in OBSOLETE_INDEXES:
+                conn.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+        columns = {row['name']: row['type'] for row in conn.execute('PRAGMA table_info(transactions)')}
+        if not columns:
+            return
+        migrated = False
+
+        # Manual entries made before foreign keys were enforced have no placeholder file row to reference
+        adopted_manual = False
+        has_files_table = bool(conn.execute('PRAGMA table_info(uploaded_files)').fetchall())
+        if has_files_table and conn.execute(
+            'SELECT 1 FROM transactions WHERE file_sha_256 = ? LIMIT 1', (MANUAL_ENTRY_SHA,)
+        ).fetchone():
+            with conn:
+                adopted_manual = conn.execute(SQL_INSERT_MANUAL_FILE, (MANUAL_ENTRY_SHA,)).rowcount > 0
+
+        # Tag links created before foreign keys were enforced don't cascade, which would block
+        # deleting any tagged transaction or tag in use; rebuild them, dropping orphaned links
+        tag_link_actions = {row['on_delete'] for row in conn.execute('PRAGMA foreign_key_list(transaction_tags)')}
+        relink_tags = bool(tag_link_actions) and tag_link_actions != {'CASCADE'}
+        if relink_tags:
+            print("Migrating transaction tags to cascading foreign keys")
+            _rebuild_table(conn, 'transaction_tags', TRANSACTION_TAGS_TABLE_SQL, '''
+                INSERT INTO {name} (transaction_id, tag_id, created_at)
+                SELECT transaction_id, tag_id, created_at
+                FROM transaction_tags
+                WHERE transaction_id IN (SELECT id FROM transactions)
+                  AND tag_id IN (SELECT id FROM tags)
+            ''')
+
+        if columns['amount'].upper() == 'REAL':
+            print("Migrating transaction amounts to integer cents")
+            _rebuild_table(conn, 'transactions', TRANSACTIONS_TABLE_SQL, '''
+                INSERT INTO {name} (id, date, description, amount, file_sha_256, notes, created_at)
+                SELECT id, date, description, CAST(ROUND(amount * 100) AS INTEGER), file_sha_256, notes, created_at
+                FROM transactions
+            ''')
+            migrated = True
+        elif 'tags_json' not in columns:
+            conn.execute('ALTER TABLE transactions ADD COLUMN tags_json TEXT')
+            migrated = True
+
+        if migrated:
+            print("Materializing transaction tags")
+            with conn:
+                conn.execute(TAGS_JSON_REFRESH)
+
+    if adopted_manual or relink_tags:
+        _invalidate_cache()
+        # Recreate the link indexes and triggers, which were dropped with the old table
+        init_db('transaction_tags')
+    if migrated:
+        _invalidate_cache()
+        # Recreate the indexes (gone with a rebuilt table) and the tag triggers
+        init_db('transactions')
+
+def reset_database(table='all'):
+    """Reset specified table(s) by dropping and recreating them.
+    WARNING: This will delete all data in the specified table(s)!
+    """
+    drop_tables(table)
 
     # Reinitialize the specified table(s)
     init_db(table)
 
 def get_tags():
-    """Get all tags from the database."""
-    if not _is_cache_valid('tags'):
-        conn = get_db_connection()
-        try:
-            df = pl.read_database("SELECT * FROM tags ORDER BY name", conn)
-            _update_cache('tags', df)
-            return df
-        finally:
-            close_thread_connection()
-    cached_data = _get_cache('tags')
-    return cached_data if cached_data is not None else pl.DataFrame()
+    """Get all tags from the database as a list of row dicts, ordered by name."""
+    hit, cached_data = _try_get('tags')
+    if not hit:
+        # A handful of rows; plain dicts are cheaper to build than a DataFrame
+        with _read_conn() as conn:
+            tags = [dict(row) for row in conn.execute('SELECT * FROM tags ORDER BY name')]
+        _update_cache('tags', tags)
+        return tags
+    return cached_data
 
 def add_tag(name, description, color):
     """Add a new tag to the database."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO tags (name, description, color)
-            VALUES (?, ?, ?)
-        ''', (name, description, color))
-        conn.commit()
-        _invalidate_cache('tags')
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        close_thread_connection()
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            c.execute(SQL_INSERT_TAG, (name, description, color))
+            conn.commit()
+            _invalidate_cache('tags')
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
 
 def update_tag(tag_id, name, description, color):
     """Update an existing tag."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute('''
-            UPDATE tags
-            SET name = ?, description = ?, color = ?
-            WHERE id = ?
-        ''', (name, description, color, tag_id))
-        conn.commit()
-        _invalidate_cache('tags')  # Only need to invalidate tags cache
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        close_thread_connection()
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            c.execute(SQL_UPDATE_TAG, (name, description, color, tag_id))
+            conn.commit()
+            _invalidate_cache('tags')
+            # A rename is carried into the transactions' materialized tags by trigger
+            _invalidate_cache('transactions')
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
 
 def delete_tag(tag_id):
     """Delete a tag."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
-        conn.commit()
-        _invalidate_cache('tags')  # Only need to invalidate tags cache
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        close_thread_connection()
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            c.execute(SQL_DELETE_TAG, (tag_id,))
+            conn.commit()
+            _invalidate_cache('tags')
+            # The cascade also removed the tag from its transactions
+            _invalidate_cache('transactions')
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
 
 def save_file_info(filename, sha_256, transaction_count):
     """Save file information to the database."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO uploaded_files (filename, sha_256, transaction_count)
-            VALUES (?, ?, ?)
-        ''', (filename, sha_256, transaction_count))
-        conn.commit()
-        _invalidate_cache('uploaded_files')
-        return True
-    except sqlite3.IntegrityError:
-        # File hash already exists
-        return False
-    finally:
-        close_thread_connection()
-
-def get_uploaded_files():
-    """Get list of uploaded files from the database."""
-    if not _is_cache_valid('uploaded_files'):
-        print("Getting uploaded files from database...")
-        conn = get_db_connection()
+    with _write_conn() as conn:
         try:
-            # First check if the table exists
             c = conn.cursor()
-            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='uploaded_files'")
-            if not c.fetchone():
-                print("uploaded_files table does not exist")
-                return pl.DataFrame()
+            c.execute(SQL_INSERT_FILE, (filename, sha_256, transaction_count))
+            conn.commit()
+            _invalidate_cache('uploaded_files')
+            return True
+        except sqlite3.IntegrityError:
+            # File hash already exists
+            conn.rollback()
+            return False
+
+def get_uploaded_hashes(sha_256_list):
+    """Return the subset of the given file hashes that have already been uploaded."""
+    with _read_conn() as conn:
+        rows = conn.execute(
+            'SELECT sha_256 FROM uploaded_files WHERE sha_256 IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(sha_256_list)),)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+def get_uploaded_files_version():
+    """Get the current version of the uploaded files list."""
+    return _uploaded_files_version
 
-            # Get the files
-            df = pl.read_database("""
+def get_uploaded_files():
+    """Get list of uploaded files from the database as row dicts, newest first."""
+    hit, cached_data = _try_get('uploaded_files')
+    if not hit:
+        logger.debug("Getting uploaded files from database...")
+        with _read_conn() as conn:
+            files = [dict(row) for row in conn.execute("""
                 SELECT filename, upload_date, transaction_count, sha_256
                 FROM uploaded_files
+                WHERE sha_256 != ?
                 ORDER BY upload_date DESC
-            """, conn)
-            print(f"Found {len(df)} files in database")
-            _update_cache('uploaded_files', df)
-            return df
-        finally:
-            close_thread_connection()
-    cached_data = _get_cache('uploaded_files')
-    return cached_data if cached_data is not None else pl.DataFrame()
+            """, (MANUAL_ENTRY_SHA,))]
+        logger.debug(f"Found {len(files)} files in database")
+        _update_cache('uploaded_files', files)
+        return files
+    return cached_data
+
+# SQLite's default bound-parameter limit on older builds; multi-row inserts are chunked to fit
+SQLITE_MAX_VARIABLES = 999
+
+def _insert_multirow(c, table, columns, rows):
+    """Insert rows using multi-row VALUES statements, chunked to the parameter limit."""
+    placeholder = '(' + ', '.join('?' * len(columns)) + ')'
+    chunk_size = SQLITE_MAX_VARIABLES // len(columns)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        c.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ', '.join([placeholder] * len(chunk)),
+            [value for row in chunk for value in row]
+        )
+
+def _insert_transactions(conn, df, sha_256):
+    """Insert a file's transactions and their tag links on the writer, without committing.
+
+    Returns the ids of the inserted transactions.
+    """
+    c = conn.cursor()
+
+    # Get tag IDs
+    tags = pl.read_database(SQL_SELECT_TAG_IDS, conn)
+
+    # Build all insert rows in one pass, with the date as an ISO format timestamp
+    notes = pl.col('Notes') if 'Notes' in df.columns else pl.lit('').alias('Notes')
+    rows = df.select([
+        pl.col('Date').dt.strftime(DATE_FORMAT),
+        pl.col('Description'),
+        (pl.col('Amount').cast(pl.Float64) * 100).round().cast(pl.Int64),
+        pl.lit(sha_256).alias('File SHA-256'),
+        notes
+    ]).rows()
+
+    # Save transactions
+    _insert_multirow(c, 'transactions', ('date', 'description', 'amount', 'file_sha_256', 'notes'), rows)
+
+    # Ids only grow and the writer is held, so the newest len(rows) ids for the hash are the rows
+    # just inserted, even when the hash already had rows (manual entries); reversed into insert order
+    transaction_ids = [row[0] for row in c.execute(
+        SQL_SELECT_FILE_TX_IDS, (sha_256, len(rows))
+    )][::-1]
+
+    # Handle tags, resolving names to ids with a join rather than per-row lookups
+    if 'Tags' in df.columns and not tags.is_empty():
+        tag_rows = (
+            df.select([
+                pl.Series('transaction_id', transaction_ids),
+                # Split tags by comma and strip whitespace
+                pl.col('Tags').cast(pl.Utf8).str.split(',').alias('tag_name')
+            ])
+            .explode('tag_name')
+            .with_columns(pl.col('tag_name').str.strip_chars())
+            .join(tags, on='tag_name', how='inner')
+            .select(['transaction_id', 'tag_id'])
+            .unique()
+            .rows()
+        )
+        _insert_multirow(c, 'transaction_tags', ('transaction_id', 'tag_id'), tag_rows)
+
+    return transaction_ids
 
 def save_transactions(df, sha_256):
     """Save transactions to the database."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-
-        # Get tag IDs
-        tags = {row[1]: row[0] for row in c.execute("SELECT id, name FROM tags")}
+    if df.is_empty():
+        return
 
-        # Create a copy of the DataFrame to avoid modifying the original
-        df_copy = df.copy()
-        df_copy['file_sha_256'] = sha_256
+    with _write_conn() as conn:
+        with conn:
+            transaction_ids = _insert_transactions(conn, df, sha_256)
+        _mark_dirty('transactions', transaction_ids)
 
-        # Convert date to ISO format timestamp
-        df_copy['Date'] = df_copy['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Save transactions
-        for _, row in df_copy.iterrows():
-            # Insert transaction
-            c.execute('''
-                INSERT INTO transactions (date, description, amount, file_sha_256, notes)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (row['Date'], row['Description'], row['Amount'], sha_256, row.get('Notes', '')))
-
-            transaction_id = c.lastrowid
+def save_uploaded_file(filename, sha_256, df):
+    """Record an uploaded file and save its transactions in a single transaction.
 
-            # Handle tags
-            if 'Tags' in row and pd.notna(row['Tags']):
-                # Split tags by comma and strip whitespace
-                tag_names = [tag.strip() for tag in str(row['Tags']).split(',')]
-                for tag_name in tag_names:
-                    if tag_name in tags:
-                        # Add tag to transaction
-                        c.execute('''
-                            INSERT INTO transaction_tags (transaction_id, tag_id)
-                            VALUES (?, ?)
-                        ''', (transaction_id, tags[tag_name]))
+    Either both are written or neither is, so a failed save never leaves the file marked as uploaded.
 
-        conn.commit()
-        _invalidate_cache('transactions')
-    finally:
-        close_thread_connection()
+    Returns:
+        bool: True if saved, False if a file with the same hash was already uploaded
+    """
+    with _write_conn() as conn:
+        try:
+            with conn:
+                conn.execute(SQL_INSERT_FILE, (filename, sha_256, len(df)))
+                transaction_ids = _insert_transactions(conn, df, sha_256) if not df.is_empty() else []
+        except sqlite3.IntegrityError as e:
+            # A concurrent upload of the same file got there first
+            if 'uploaded_files.sha_256' in str(e):
+                return False
+            raise
+        _invalidate_cache('uploaded_files')
+        _mark_dirty('transactions', transaction_ids)
+    return True
+
+# Rows fetched per round trip when streaming transactions out of SQLite
+TRANSACTIONS_BATCH_SIZE = 50_000
+
+TRANSACTIONS_SELECT = """
+    SELECT t.id AS id,
+           COALESCE(strftime('%Y-%m-%dT%H:%M:%S', t.date), t.date) AS "Date",
+           t.description AS "Description",
+           t.amount / 100.0 AS "Amount", t.notes AS "Notes",
+           t.file_sha_256 AS "File SHA-256", f.filename AS "Source File",
+           t.tags_json AS "Tags"
+    FROM transactions t
+    LEFT JOIN uploaded_files f ON t.file_sha_256 = f.sha_256
+"""
+TRANSACTIONS_QUERY = TRANSACTIONS_SELECT + "ORDER BY t.date DESC"
+TRANSACTIONS_BY_ID_QUERY = TRANSACTIONS_SELECT + "WHERE t.id IN (SELECT value FROM json_each(?))"
+
+def _prepare_transactions(df):
+    """Decode the tags and parse the dates of a frame of raw transaction rows."""
+    df = df.with_columns(
+        # JSON arrays keep tag names intact even when they contain commas
+        pl.col('Tags').cast(pl.Utf8).str.json_decode(pl.List(pl.Utf8)),
+        pl.col('Date').str.to_datetime(format=DATE_FORMAT, strict=False)
+    )
+    return df.sort('Date', descending=True)
+
+def _patch_transactions(df, transaction_ids):
+    """Replace the given transactions in a cached frame with their current database rows."""
+    with _read_conn() as conn:
+        changed = pl.read_database(
+            TRANSACTIONS_BY_ID_QUERY, conn,
+            execute_options={'parameters': (json.dumps(list(transaction_ids)),)}
+        )
+        df = df.filter(~pl.col('id').is_in(list(transaction_ids)))
+        if changed.is_empty():
+            return df
+        changed = _prepare_transactions(changed)
+    return pl.concat([df, changed], how='vertical_relaxed').sort('Date', descending=True)
 
 def load_transactions():
     """Load all transactions from the database."""
-    if not _is_cache_valid('transactions'):
-        if not os.path.exists(DB_PATH):
-            return pl.DataFrame()
-
-        conn = get_db_connection()
-        try:
-            # Get transactions with their tags
-            df = pl.read_database("""
-                SELECT t.id, t.date, t.description, t.amount, t.notes,
-                       GROUP_CONCAT(tg.name) as tags,
-                       t.file_sha_256, f.filename
-                FROM transactions t
-                LEFT JOIN transaction_tags tt ON t.id = tt.transaction_id
-                LEFT JOIN tags tg ON tt.tag_id = tg.id
-                JOIN uploaded_files f ON t.file_sha_256 = f.sha_256
-                GROUP BY t.id
-                ORDER BY t.date DESC
-            """, conn)
+    hit, cached_data = _try_get('transactions')
+    dirty_ids = _take_dirty('transactions')
+    if hit and dirty_ids:
+        # Patch a few changed rows in place; past the threshold a full reload is cheaper
+        if len(dirty_ids) <= DIRTY_REBUILD_FRACTION * len(cached_data):
+            cached_data = _patch_transactions(cached_data, dirty_ids)
+            _update_cache('transactions', cached_data)
+        else:
+            hit = False
+    if not hit:
+        with _read_conn() as conn:
+            # Stream the rows in batches so SQLite's row buffer never holds the whole table
+            batches = list(pl.read_database(
+                TRANSACTIONS_QUERY, conn, iter_batches=True, batch_size=TRANSACTIONS_BATCH_SIZE
+            ))
+            df = pl.concat(batches, how='vertical_relaxed') if batches else pl.DataFrame()
 
             if not df.is_empty():
-                df = df.with_columns([
-                    pl.col('date').str.to_datetime(format='%Y-%m-%d %H:%M:%S').alias('Date'),
-                    pl.col('description').alias('Description'),
-                    pl.col('amount').alias('Amount'),
-                    pl.col('notes').alias('Notes'),
-                    pl.col('tags').alias('Tags'),
-                    pl.col('file_sha_256').alias('File SHA-256'),
-                    pl.col('filename').alias('Source File')
-                ])
+                df = _prepare_transactions(df)
             _update_cache('transactions', df)
             return df
-        finally:
-            close_thread_connection()
-    cached_data = _get_cache('transactions')
-    return cached_data if cached_data is not None else pl.DataFrame()
+    return cached_data
 
-def update_transaction_tags(transaction_id, tag_ids):
-    """Update the tags of a transaction."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        # Remove existing tags
-        c.execute('DELETE FROM transaction_tags WHERE transaction_id = ?', (transaction_id,))
+def load_transactions_iter(batch_size=TRANSACTIONS_BATCH_SIZE):
+    """Yield transactions newest first, one batch at a time, without caching them.
 
-        # Add new tags
-        for tag_id in tag_ids:
-            c.execute('''
-                INSERT INTO transaction_tags (transaction_id, tag_id)
-                VALUES (?, ?)
-            ''', (transaction_id, tag_id))
+    Args:
+        batch_size (int): Maximum number of transactions per yielded frame
 
-        conn.commit()
-        _invalidate_cache('transactions')
-        return True
-    except Exception as e:
-        print(f"Error updating transaction tags: {e}")
-        return False
-    finally:
-        close_thread_connection()
+    Yields:
+        pl.DataFrame: A batch of transactions with the same columns as load_transactions
+    """
+    with _read_conn() as conn:
+        for batch in pl.read_database(TRANSACTIONS_QUERY, conn, iter_batches=True, batch_size=batch_size):
+            if not batch.is_empty():
+                yield _prepare_transactions(batch)
+
+def update_transaction_tags(transaction_id, tag_ids):
+    """Update the tags of a transaction."""
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            # Only touch the rows for tags that were actually added or removed
+            old_tag_ids = {row[0] for row in c.execute(
+                SQL_SELECT_TX_TAG_IDS, (transaction_id,)
+            )}
+            new_tag_ids = set(tag_ids)
+            to_remove = old_tag_ids - new_tag_ids
+            to_add = new_tag_ids - old_tag_ids
+            if not to_remove and not to_add:
+                return True
+
+            with conn:
+                c.executemany(SQL_DELETE_TX_TAG, [(transaction_id, tag_id) for tag_id in to_remove])
+                c.executemany(SQL_INSERT_TX_TAG, [(transaction_id, tag_id) for tag_id in to_add])
+
+            _mark_dirty('transactions', [transaction_id])
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error updating transaction tags: {e}")
+            return False
 
 def update_transaction_note(transaction_id, note):
     """Update the note of a transaction."""
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute('''
-            UPDATE transactions
-            SET notes = ?
-            WHERE id = ?
-        ''', (note, transaction_id))
-        conn.commit()
-        _invalidate_cache('transactions')
-        return True
-    except Exception as e:
-        print(f"Error updating transaction note: {e}")
-        return False
-    finally:
-        close_thread_connection()
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            c.execute(SQL_UPDATE_TX_NOTE, (note, transaction_id))
+            conn.commit()
+            _mark_dirty('transactions', [transaction_id])
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error updating transaction note: {e}")
+            return False
 
 def get_tag_name_to_id_mapping():
-    """Get a mapping of tag names to their IDs."""
-    if not _is_cache_valid('tags'):
-        conn = get_db_connection()
-        try:
-            mapping = {row[1]: row[0] for row in conn.execute("SELECT id, name FROM tags")}
-            _update_cache('tag_mapping', mapping)
-            return mapping
-        finally:
-            close_thread_connection()
-    cached_data = _get_cache('tag_mapping')
-    return cached_data if cached_data is not None else {}
+    """Get a mapping of tag names to their IDs, derived from the cached tags."""
+    tags = get_tags()
+    # The mapping is memoized against the tags list it was built from
+    hit, cached_data = _try_get('tag_mapping')
+    if hit and cached_data[0] is tags:
+        return cached_data[1]
+
+    mapping = {tag['name']: tag['id'] for tag in tags}
+    _update_cache('tag_mapping', (tags, mapping))
+    return mapping
+
+def get_tag_options():
+    """Get the tag dropdown options, derived from the cached tags."""
+    tags = get_tags()
+    hit, cached_data = _try_get('tag_options')
+    if hit and cached_data[0] is tags:
+        return cached_data[1]
+
+    options = [{'label': tag['name'], 'value': tag['id']} for tag in tags]
+    _update_cache('tag_options', (tags, options))
+    return options
 
 def create_manual_transaction(date, description, amount, notes=None, tags=None):
     """Create a new transaction manually.
@@ -449,94 +827,60 @@ def create_manual_transaction(date, description, amount, notes=None, tags=None):
     Returns:
         int: The ID of the newly created transaction, or None if creation failed
     """
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        # Insert transaction
-        c.execute('''
-            INSERT INTO transactions (date, description, amount, notes, file_sha_256)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (date, description, amount, notes, 'manual_entry'))
-
-        transaction_id = c.lastrowid
-
-        # Add tags if any
-        if tags:
-            for tag_id in tags:
-                c.execute('''
-                    INSERT INTO transaction_tags (transaction_id, tag_id)
-                    VALUES (?, ?)
-                ''', (transaction_id, tag_id))
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            # Insert transaction
+            # Manual transactions hang off a placeholder file row to satisfy the foreign key
+            c.execute(SQL_INSERT_MANUAL_FILE, (MANUAL_ENTRY_SHA,))
+            c.execute(SQL_INSERT_TX_MANUAL, (date.strftime(DATE_FORMAT), description, round(amount * 100), notes, MANUAL_ENTRY_SHA))
 
-        conn.commit()
-        _invalidate_cache('transactions')
-        return transaction_id
-    except Exception as e:
-        print(f"Error creating manual transaction: {e}")
-        return None
-    finally:
-        close_thread_connection()
+            transaction_id = c.lastrowid
+
+            # Add tags if any
+            if tags:
+                c.executemany(SQL_INSERT_TX_TAG, [(transaction_id, tag_id) for tag_id in tags])
+
+            conn.commit()
+            _mark_dirty('transactions', [transaction_id])
+            return transaction_id
+        except Exception as e:
+            conn.rollback()
+            print(f"Error creating manual transaction: {e}")
+            return None
 
 def load_transactions_with_sort(sort_column='date', ascending=True, search_text=None, search_text_on=None):
-    """Load transactions from the database with sorting and optional search applied."""
-    cache_key = f"transactions_sort_{sort_column}_{ascending}_{search_text}_{search_text_on}"
-    if not _is_cache_valid(cache_key):
-        conn = get_db_connection()
-        try:
-            # Validate sort column to prevent SQL injection
-            valid_columns = ['date', 'description', 'amount']
-            sort_column = sort_column.lower()
-            if sort_column not in valid_columns:
-                sort_column = 'date'
-
-            # Map column names to their table-qualified versions
-            column_map = {
-                'date': 't.date',
-                'description': 't.description',
-                'amount': 't.amount'
-            }
-
-            # Build the query with sorting and optional search
-            query = f"""
-            SELECT t.id, t.date, t.description, t.amount, t.notes,
-                   GROUP_CONCAT(tg.name) as tags,
-                   t.file_sha_256, f.filename as source_file
-            FROM transactions t
-            LEFT JOIN transaction_tags tt ON t.id = tt.transaction_id
-            LEFT JOIN tags tg ON tt.tag_id = tg.id
-            LEFT JOIN uploaded_files f ON t.file_sha_256 = f.sha_256
-            WHERE 1=1
-            """
-
-            # Add search condition if search_text is provided
-            if search_text:
-                query += f" AND {column_map[search_text_on]} LIKE '%{search_text}%'"
-
-            query += f"""
-            GROUP BY t.id
-            ORDER BY {column_map[sort_column]} {'ASC' if ascending else 'DESC'}
-            """
-
-            df = pl.read_database(query, conn)
-
-            # Convert date strings to datetime and rename columns
-            df = df.with_columns([
-                pl.col('date').str.to_datetime(format='%Y-%m-%d %H:%M:%S', strict=False)
-                .fill_null(pl.col('date').str.to_datetime(format='%Y-%m-%d', strict=False))
-                .alias('Date'),
-                pl.col('description').alias('Description'),
-                pl.col('amount').alias('Amount'),
-                pl.col('notes').alias('Notes'),
-                pl.col('tags').alias('Tags'),
-                pl.col('file_sha_256').alias('File SHA-256'),
-                pl.col('source_file').alias('Source File')
-            ])
-            _update_cache(cache_key, df)
-            return df
-        finally:
-            close_thread_connection()
-    cached_data = _get_cache(cache_key)
-    return cached_data if cached_data is not None else pl.DataFrame()
+    """Load transactions with sorting and optional search applied.
+
+    Sorting and searching run in memory against the cached frame from load_transactions,
+    so only the base query ever hits the database.
+    """
+    # Map column names to their display versions
+    column_map = {
+        'date': 'Date',
+        'description': 'Description',
+        'amount': 'Amount'
+    }
+
+    sort_column = sort_column.lower()
+    if sort_column not in column_map:
+        sort_column = 'date'
+
+    df = load_transactions()
+    if df.is_empty():
+        return df
+
+    # Apply search condition if search_text is provided
+    if search_text:
+        search_column = column_map.get(search_text_on, 'Description')
+        searched = pl.col(search_column)
+        if search_column == 'Date':
+            # Match against the dates as stored, not polars' default datetime formatting
+            searched = searched.dt.strftime(DATE_FORMAT)
+        # Case-insensitive like the SQL LIKE this replaced, with the text matched literally
+        df = df.filter(searched.cast(pl.Utf8).str.contains(f'(?i){re.escape(search_text)}'))
+
+    return df.sort(column_map[sort_column], descending=not ascending)
 
 def delete_transactions(transaction_ids):
     """Delete multiple transactions by their IDs.
@@ -547,20 +891,15 @@ def delete_transactions(transaction_ids):
     Returns:
         bool: True if deletion was successful, False otherwise
     """
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        # First delete associated tags
-        c.executemany('DELETE FROM transaction_tags WHERE transaction_id = ?',
-                     [(id,) for id in transaction_ids])
-        # Then delete the transactions
-        c.executemany('DELETE FROM transactions WHERE id = ?',
-                     [(id,) for id in transaction_ids])
-        conn.commit()
-        _invalidate_cache('transactions')
-        return True
-    except Exception as e:
-        print(f"Error deleting transactions: {e}")
-        return False
-    finally:
-        close_thread_connection()
\ No newline at end of file
+    with _write_conn() as conn:
+        try:
+            c = conn.cursor()
+            # Tag links are removed by the ON DELETE CASCADE on transaction_tags
+            with conn:
+                c.execute(SQL_DELETE_TXS, (json.dumps(list(transaction_ids)),))
+            _mark_dirty('transactions', transaction_ids)
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error deleting transactions: {e}")
+            return False
\ No newline at end of file
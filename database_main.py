@@ -1,12 +1,21 @@
+import logging
 import os
-from database import DB_PATH, reset_database, init_db
+from database import DB_PATH, reset_database, init_db, drop_tables, close_all_connections
 import click
-import sqlite3
 from rich.console import Console
 from rich.prompt import Confirm
 
 console = Console()
 
+def _deletion_warning(table):
+    """Describe what dropping the given table(s) deletes, including dependent data."""
+    if table in ('transactions', 'tags'):
+        return f"This will delete all data in the {table} table and every transaction tag link!"
+    return "This will delete all data in those tables!"
+
+# Configure logging once for the CLI; the database modules only log at debug level
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
 @click.group()
 def cli():
     """Database management utility for House Money"""
@@ -30,7 +39,7 @@ def reset(table):
         console.print(f"[yellow]Database does not exist at {DB_PATH}[/yellow]")
         return
 
-    if not Confirm.ask(f"Are you sure you want to reset the {table} table(s) at {DB_PATH}? This will delete all data in those tables!"):
+    if not Confirm.ask(f"Are you sure you want to reset the {table} table(s) at {DB_PATH}? {_deletion_warning(table)}"):
         return
 
     reset_database(table)
@@ -44,24 +53,14 @@ def delete(table):
         console.print(f"[yellow]Database does not exist at {DB_PATH}[/yellow]")
         return
 
-    if not Confirm.ask(f"Are you sure you want to delete the {table} table(s) from {DB_PATH}?"):
+    if not Confirm.ask(f"Are you sure you want to delete the {table} table(s) from {DB_PATH}? {_deletion_warning(table)}"):
         return
 
-    # Connect to database and drop the specified table(s)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    if table == 'all':
-        tables = ['transactions', 'tags', 'uploaded_files', 'transaction_tags']
-    else:
-        tables = [table]
-
-    for t in tables:
-        c.execute(f'DROP TABLE IF EXISTS {t}')
-
-    conn.commit()
-    conn.close()
+    drop_tables(table)
     console.print(f"[green]Table(s) deleted from {DB_PATH}[/green]")
 
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    try:
+        cli()
+    finally:
+        close_all_connections()
\ No newline at end of file
@@ -1,90 +1,101 @@
 import base64
 import hashlib
 import io
+import logging
+import os
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 import polars as pl
-import sqlite3
-from database import DB_PATH, save_file_info, save_transactions
-
-def calculate_file_hash(contents):
-    """Calculate SHA-256 hash of file contents."""
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
+from database import get_uploaded_hashes, save_uploaded_file
+
+logger = logging.getLogger(__name__)
+
+# Column mappings for the supported CSV formats ('custom' is supplied by the caller).
+# Read-only, so they can't drift from the plans precomputed from them below.
+FORMAT_MAPPINGS = MappingProxyType({
+    'standard': MappingProxyType({
+        'date': 'Date',
+        'description': 'Description',
+        'amount': 'Amount'
+    }),
+    'bank': MappingProxyType({
+        'date': 'Transaction Date',
+        'description': 'Details',
+        'amount': 'Transaction Amount'
+    })
+})
+
+def _column_plan(mapping):
+    """Work out the CSV schema overrides and standard-name renames for a column mapping."""
+    # Type the date and amount columns while parsing instead of casting afterwards
+    schema_overrides = {mapping['date']: pl.Datetime, mapping['amount']: pl.Float64, 'Tags': pl.Utf8}
+    renames = {
+        mapping[key]: target
+        for key, target in FORMAT_MAPPINGS['standard'].items()
+        if mapping[key] != target
+    }
+    return schema_overrides, renames
+
+# Plans for the built-in formats are computed once; only 'custom' is worked out per file
+FORMAT_PLANS = MappingProxyType({
+    name: tuple(MappingProxyType(part) for part in _column_plan(mapping))
+    for name, mapping in FORMAT_MAPPINGS.items()
+})
+
+def _decode(contents):
+    """Decode a base64 data-URL upload into the raw file bytes."""
+    content_type, content_string = contents.split(',', 1)
+    return base64.b64decode(content_string, validate=False)
+
+def calculate_file_hash(decoded):
+    """Calculate SHA-256 hash of decoded file contents."""
     return hashlib.sha256(decoded).hexdigest()
 
-def parse_contents(contents, filename, format_type='standard', custom_columns=None):
-    print(f"Parsing contents for {filename} with format {format_type}")
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-
+def parse_contents(decoded, filename, format_type='standard', custom_columns=None):
+    logger.debug(f"Parsing contents for {filename} with format {format_type}")
     try:
-        df = pl.read_csv(io.StringIO(decoded.decode('utf-8')))
-        print(f"Successfully read CSV with columns: {df.columns}")
-
-        # Define column mappings for different formats
-        format_mappings = {
-            'standard': {
-                'date': 'Date',
-                'description': 'Description',
-                'amount': 'Amount'
-            },
-            'bank': {
-                'date': 'Transaction Date',
-                'description': 'Details',
-                'amount': 'Transaction Amount'
-            },
-            'custom': custom_columns or {
-                'date': 'Date',
-                'description': 'Description',
-                'amount': 'Amount'
-            }
-        }
-
         # Get the appropriate column mapping
-        mapping = format_mappings[format_type]
-        print(f"Using column mapping: {mapping}")
+        if format_type == 'custom' and custom_columns:
+            mapping = custom_columns
+            schema_overrides, renames = _column_plan(mapping)
+        else:
+            # A custom upload without columns falls back to the standard format
+            name = 'standard' if format_type == 'custom' else format_type
+            mapping = FORMAT_MAPPINGS[name]
+            schema_overrides, renames = FORMAT_PLANS[name]
+        logger.debug(f"Using column mapping: {mapping}")
+
+        # polars wants a plain dict, not the read-only view the precomputed plans hold
+        lf = pl.scan_csv(io.BytesIO(decoded), schema_overrides=dict(schema_overrides))
+        columns = lf.collect_schema().names()
+        logger.debug(f"Successfully read CSV with columns: {columns}")
 
         # Check if required columns exist in the CSV
-        if not all(col in df.columns for col in mapping.values()):
-            missing_cols = [col for col in mapping.values() if col not in df.columns]
-            print(f"Missing required columns: {missing_cols}")
+        if not all(col in columns for col in mapping.values()):
+            missing_cols = [col for col in mapping.values() if col not in columns]
+            logger.debug(f"Missing required columns: {missing_cols}")
             return None, f"CSV is missing required columns: {', '.join(missing_cols)}"
 
-        # Rename columns to standard format
-        df = df.rename({
-            mapping['date']: 'Date',
-            mapping['description']: 'Description',
-            mapping['amount']: 'Amount'
-        })
-        print("Columns renamed successfully")
-
-        # Convert date column to datetime
-        df = df.with_columns(pl.col('Date').cast(pl.Datetime))
-        print("Date column converted to datetime")
+        # Rename columns to standard format (nothing to do for the standard format)
+        if renames:
+            lf = lf.rename(renames)
 
         # Add Tags column if it doesn't exist
-        if 'Tags' not in df.columns:
-            df = df.with_columns(pl.lit('').alias('Tags'))
-            print("Added empty Tags column")
-
-        # Ensure Amount is numeric
-        df = df.with_columns(pl.col('Amount').cast(pl.Decimal))
-        print("Amount column converted to numeric")
+        if 'Tags' not in columns:
+            lf = lf.with_columns(pl.lit('').alias('Tags'))
 
-        # Remove any rows with invalid amounts
-        original_len = len(df)
-        df = df.filter(pl.col('Amount').is_not_null())
-        if len(df) < original_len:
-            print(f"Removed {original_len - len(df)} rows with invalid amounts")
+        # Remove any rows with invalid amounts, all in a single collect
+        df = lf.filter(pl.col('Amount').is_not_null()).collect()
 
-        print(f"Successfully parsed {len(df)} transactions")
+        logger.debug(f"Successfully parsed {len(df)} transactions")
         return df, None
     except Exception as e:
-        print(f"Error in parse_contents: {str(e)}")
+        logger.error(f"Error in parse_contents: {str(e)}")
         return None, f"Error processing {filename}: {str(e)}"
 
 def process_uploaded_files(contents_list, filename_list, format_type, custom_date_col=None, custom_desc_col=None, custom_amount_col=None):
     """Process a list of uploaded files and return the combined data."""
-    print(f"Processing {len(contents_list) if contents_list else 0} files")
+    logger.debug(f"Processing {len(contents_list) if contents_list else 0} files")
     if not contents_list:
         return None, [], []
 
@@ -99,49 +110,62 @@ def process_uploaded_files(contents_list, filename_list, format_type, custom_dat
     dfs = []
     status_messages = []
 
-    for contents, filename in zip(contents_list, filename_list):
-        print(f"Processing file: {filename}")
-        # Calculate file hash
-        sha_256 = calculate_file_hash(contents)
-        print(f"File hash: {sha_256}")
-
-        # Check if file was already uploaded
-        if not save_file_info(filename, sha_256, 0):  # We'll update the count after processing
-            print(f"File {filename} was already uploaded")
+    # Decoding, hashing and parsing are independent per file (and hashing and CSV parsing
+    # release the GIL), so they run on a thread pool; the database writes below stay serial
+    with ThreadPoolExecutor(max_workers=min(len(contents_list), os.cpu_count() or 1)) as executor:
+        # Hash every file up front so duplicates can be found with a single query.
+        # Each file is decoded once and the bytes are shared by hashing and parsing.
+        decoded_list = list(executor.map(_decode, contents_list))
+        hashes = list(executor.map(calculate_file_hash, decoded_list))
+        already_uploaded = get_uploaded_hashes(hashes)
+
+        new_files = []
+        for decoded, sha_256, filename in zip(decoded_list, hashes, filename_list):
+            logger.debug(f"Processing file: {filename}")
+            logger.debug(f"File hash: {sha_256}")
+
+            # Check if file was already uploaded (or appears twice in this batch)
+            if sha_256 in already_uploaded:
+                logger.debug(f"File {filename} was already uploaded")
+                status_messages.append(f"⚠️ {filename} was already uploaded and will be skipped")
+                continue
+            already_uploaded.add(sha_256)
+            new_files.append((decoded, filename, sha_256))
+
+        parsed = list(executor.map(
+            lambda new_file: parse_contents(new_file[0], new_file[1], format_type, custom_columns),
+            new_files
+        ))
+
+    for (_, filename, sha_256), (df, error) in zip(new_files, parsed):
+        if df is None:
+            logger.debug(f"Error parsing {filename}: {error}")
+            status_messages.append(f"❌ {filename}: {error}")
+            continue
+        logger.debug(f"Successfully parsed {len(df)} transactions from {filename}")
+
+        # Record the file with its final count and save its transactions in one transaction
+        logger.debug(f"Saving {len(df)} transactions to database")
+        try:
+            saved = save_uploaded_file(filename, sha_256, df)
+        except Exception as e:
+            logger.error(f"Error saving {filename}: {str(e)}")
+            status_messages.append(f"❌ {filename}: {str(e)}")
+            continue
+        if not saved:
+            logger.debug(f"File {filename} was already uploaded")
             status_messages.append(f"⚠️ {filename} was already uploaded and will be skipped")
             continue
-
-        df, error = parse_contents(contents, filename, format_type, custom_columns)
-        if df is not None:
-            print(f"Successfully parsed {len(df)} transactions from {filename}")
-            dfs.append((df, sha_256))  # Store both df and sha_256
-            # Update transaction count
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute('''
-                UPDATE uploaded_files
-                SET transaction_count = ?
-                WHERE sha_256 = ?
-            ''', (len(df), sha_256))
-            conn.commit()
-            conn.close()
-            status_messages.append(f"✅ {filename} uploaded successfully ({len(df)} transactions)")
-        else:
-            print(f"Error parsing {filename}: {error}")
-            status_messages.append(f"❌ {filename}: {error}")
+        dfs.append((df, sha_256, filename))
+        status_messages.append(f"✅ {filename} uploaded successfully ({len(df)} transactions)")
 
     if not dfs:
-        print("No dataframes were successfully processed")
+        logger.debug("No dataframes were successfully processed")
         return None, [], status_messages
 
-    # Save each dataframe with its corresponding sha_256
-    for df, sha_256 in dfs:
-        print(f"Saving {len(df)} transactions to database")
-        save_transactions(df, sha_256)
-
     # Combine all dataframes for display
-    combined_df = pl.concat([df for df, _ in dfs])
-    print(f"Combined dataframe has {len(combined_df)} transactions")
+    combined_df = pl.concat([df for df, _, _ in dfs])
+    logger.debug(f"Combined dataframe has {len(combined_df)} transactions")
 
     # Sort by date
     combined_df = combined_df.sort('Date', descending=True)
@@ -150,7 +174,13 @@ def process_uploaded_files(contents_list, filename_list, format_type, custom_dat
     combined_df = combined_df.with_columns(pl.col('Date').dt.strftime('%Y-%m-%d'))
 
     # Get unique tags
-    tags = [{'label': tag, 'value': tag} for tag in combined_df['Tags'].str.split(',').explode().unique() if tag]
-    print(f"Found {len(tags)} unique tags")
+    unique_tags = (
+        combined_df.select(pl.col('Tags').str.split(',').explode().str.strip_chars())
+        .filter(pl.col('Tags') != '')
+        .unique()
+        .sort('Tags')
+    )
+    tags = unique_tags.select(pl.struct(label='Tags', value='Tags')).to_series().to_list()
+    logger.debug(f"Found {len(tags)} unique tags")
 
     return combined_df.to_dicts(), tags, status_messages
\ No newline at end of file
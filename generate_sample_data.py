@@ -1,96 +1,222 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 
-def generate_sample_transactions(num_transactions=100, start_date=None, end_date=None):
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow is optional; without it the CSV is written by pandas
+    pa = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; without it sampling uses vectorized NumPy
+    njit = None
+
+# Define categories and their typical transaction descriptions
+CATEGORIES = {
+    'Groceries': [
+        'Walmart', 'Target', 'Whole Foods', 'Trader Joes', 'Kroger',
+        'Costco', 'Safeway', 'Grocery Store', 'Supermarket'
+    ],
+    'Dining': [
+        'Restaurant', 'Cafe', 'Coffee Shop', 'Fast Food', 'Pizza Place',
+        'Food Delivery', 'Takeout', 'Dinner', 'Lunch', 'Breakfast'
+    ],
+    'Transportation': [
+        'Gas Station', 'Uber', 'Lyft', 'Taxi', 'Public Transit',
+        'Parking', 'Car Maintenance', 'Auto Parts', 'Oil Change'
+    ],
+    'Shopping': [
+        'Amazon', 'Online Store', 'Department Store', 'Clothing Store',
+        'Electronics Store', 'Home Goods', 'Furniture Store'
+    ],
+    'Entertainment': [
+        'Movie Theater', 'Streaming Service', 'Concert', 'Theater',
+        'Sports Event', 'Gym', 'Fitness Center', 'Hobby Store'
+    ],
+    'Utilities': [
+        'Electric Bill', 'Water Bill', 'Internet', 'Phone Bill',
+        'Cable TV', 'Gas Bill', 'Utility Payment'
+    ],
+    'Housing': [
+        'Rent', 'Mortgage', 'Home Repair', 'Home Improvement',
+        'Property Tax', 'Home Insurance'
+    ],
+    'Healthcare': [
+        'Doctor Visit', 'Pharmacy', 'Medical Supplies', 'Health Insurance',
+        'Dental', 'Vision', 'Medical Bill'
+    ]
+}
+
+# Structure-of-arrays view of the categories, indexed by integer category code
+CAT_NAMES = np.array(list(CATEGORIES.keys()))
+CAT_DESC_ARRAYS = [np.array(descriptions, dtype=object) for descriptions in CATEGORIES.values()]
+# (low, high) amount bounds per category, in the same order as CATEGORIES
+CAT_BOUNDS = np.array([
+    [20, 200],    # Groceries
+    [10, 100],    # Dining
+    [15, 150],    # Transportation
+    [25, 300],    # Shopping
+    [10, 200],    # Entertainment
+    [50, 300],    # Utilities
+    [500, 3000],  # Housing
+    [20, 500],    # Healthcare
+], dtype=np.float64)
+# The same bounds in whole cents, which is how amounts are drawn
+CAT_BOUNDS_CENTS = np.round(CAT_BOUNDS * 100).astype(np.int64)
+CAT_DESC_COUNTS = np.array([len(descriptions) for descriptions in CAT_DESC_ARRAYS], dtype=np.int64)
+# Every description in one vocabulary; a category's descriptions start at its offset
+ALL_DESCS = np.concatenate(CAT_DESC_ARRAYS)
+CAT_DESC_OFFSETS = np.concatenate(([0], np.cumsum(CAT_DESC_COUNTS)[:-1]))
+
+# Rows generated and written per batch when streaming a large sample to disk
+STREAM_CHUNK_ROWS = 100_000
+# Write buffer for the pandas CSV fallback, so rows reach the disk in few large writes
+CSV_BUFFER_BYTES = 1 << 20
+
+def _day_counts(rng, num_transactions, date_range):
+    """Draw how many transactions land on each day of the range.
+
+    Sorted uniform day offsets are fully described by these counts, so expanding
+    them gives sorted dates without a sort.
+    """
+    days = date_range + 1
+    return rng.multinomial(num_transactions, np.full(days, 1 / days))
+
+def _sample_numpy(cat_idx, uniforms):
+    """Map uniform draws to description indices and amounts in cents for the given categories."""
+    # Scale each uniform onto its category's range and truncate; amounts land on whole cents
+    # within the category's bounds, so no rounding is needed
+    desc_idx = (uniforms[0] * CAT_DESC_COUNTS[cat_idx]).astype(np.int64)
+    low, high = CAT_BOUNDS_CENTS[cat_idx, 0], CAT_BOUNDS_CENTS[cat_idx, 1]
+    cents = low + (uniforms[1] * (high - low + 1)).astype(np.int64)
+    return desc_idx, cents
+
+if njit is not None:
+    # Eagerly compiled for the exact argument types, cached on disk so later runs skip the JIT
+    @njit('Tuple((int64[::1], int64[::1]))(int64[::1], float64[:, ::1], int64[:, ::1], int64[::1])',
+          parallel=True, cache=True)
+    def _sample_kernel(cat_idx, uniforms, bounds, desc_counts):
+        """Compiled equivalent of _sample_numpy, mapping every transaction in one parallel loop.
+
+        The kernel draws nothing itself: Numba's RNG state is per thread, so draws spread over
+        prange workers would not follow the seed.
+        """
+        num_transactions = cat_idx.shape[0]
+        desc_idx = np.empty(num_transactions, dtype=np.int64)
+        cents = np.empty(num_transactions, dtype=np.int64)
+        for i in prange(num_transactions):
+            category = cat_idx[i]
+            desc_idx[i] = np.int64(uniforms[0, i] * desc_counts[category])
+            low = bounds[category, 0]
+            cents[i] = low + np.int64(uniforms[1, i] * (bounds[category, 1] - low + 1))
+        return desc_idx, cents
+
+def _sample(rng, num_transactions):
+    """Draw category and description indices and amounts in cents.
+
+    Every draw comes from the seeded generator, so both paths give the same data for a seed;
+    Numba, when available, only does the mapping.
+    """
+    cat_idx = rng.integers(0, len(CAT_NAMES), size=num_transactions)
+    uniforms = rng.random((2, num_transactions))
+    if njit is not None:
+        desc_idx, cents = _sample_kernel(cat_idx, uniforms, CAT_BOUNDS_CENTS, CAT_DESC_COUNTS)
+    else:
+        desc_idx, cents = _sample_numpy(cat_idx, uniforms)
+    return cat_idx, desc_idx, cents
+
+def _build_frame(start_date, offsets, cat_idx, desc_idx, cents):
+    """Assemble sampled arrays into a transactions DataFrame."""
+    # Dates stay datetime64 (8 bytes a row); the CSV writers format them as 'YYYY-MM-DD' in C
+    dates = np.datetime64(start_date.date()) + offsets.astype('timedelta64[D]')
+
+    # Descriptions are codes into the shared vocabulary rather than a string per row
+    desc_codes = CAT_DESC_OFFSETS[cat_idx] + desc_idx
+
+    # Create DataFrame column-wise from the arrays
+    return pd.DataFrame({
+        'Date': dates,
+        'Description': pd.Categorical.from_codes(desc_codes.astype(np.int8), categories=ALL_DESCS),
+        # Exact cents scaled once; float32 holds every amount to well within a cent
+        'Amount': cents.astype(np.float32) / 100,
+        'Category': pd.Categorical.from_codes(cat_idx.astype(np.int8), categories=CAT_NAMES)
+    })
+
+def _to_arrow(df):
+    """Convert a transactions frame to an Arrow table with the dates as plain dates."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.set_column(0, 'Date', table['Date'].cast(pa.date32()))
+
+def generate_sample_transactions(num_transactions=100, start_date=None, end_date=None, seed=None,
+                                 save_csv=True, path='sample_transactions.csv'):
     if start_date is None:
         start_date = datetime.now() - timedelta(days=365)
     if end_date is None:
         end_date = datetime.now()
 
-    # Define categories and their typical transaction descriptions
-    categories = {
-        'Groceries': [
-            'Walmart', 'Target', 'Whole Foods', 'Trader Joes', 'Kroger',
-            'Costco', 'Safeway', 'Grocery Store', 'Supermarket'
-        ],
-        'Dining': [
-            'Restaurant', 'Cafe', 'Coffee Shop', 'Fast Food', 'Pizza Place',
-            'Food Delivery', 'Takeout', 'Dinner', 'Lunch', 'Breakfast'
-        ],
-        'Transportation': [
-            'Gas Station', 'Uber', 'Lyft', 'Taxi', 'Public Transit',
-            'Parking', 'Car Maintenance', 'Auto Parts', 'Oil Change'
-        ],
-        'Shopping': [
-            'Amazon', 'Online Store', 'Department Store', 'Clothing Store',
-            'Electronics Store', 'Home Goods', 'Furniture Store'
-        ],
-        'Entertainment': [
-            'Movie Theater', 'Streaming Service', 'Concert', 'Theater',
-            'Sports Event', 'Gym', 'Fitness Center', 'Hobby Store'
-        ],
-        'Utilities': [
-            'Electric Bill', 'Water Bill', 'Internet', 'Phone Bill',
-            'Cable TV', 'Gas Bill', 'Utility Payment'
-        ],
-        'Housing': [
-            'Rent', 'Mortgage', 'Home Repair', 'Home Improvement',
-            'Property Tax', 'Home Insurance'
-        ],
-        'Healthcare': [
-            'Doctor Visit', 'Pharmacy', 'Medical Supplies', 'Health Insurance',
-            'Dental', 'Vision', 'Medical Bill'
-        ]
-    }
-
-    # Generate random dates
+    # One seeded PCG64 generator drives every draw, so a seed reproduces the data
+    rng = np.random.default_rng(seed)
+
+    # Generate random dates as sorted day offsets from the start date, with a category,
+    # description and amount per transaction
     date_range = (end_date - start_date).days
-    dates = [start_date + timedelta(days=random.randint(0, date_range)) for _ in range(num_transactions)]
-    dates.sort()
-
-    # Generate transactions
-    transactions = []
-    for date in dates:
-        # Select a random category
-        category = random.choice(list(categories.keys()))
-        # Select a random description from the category
-        description = random.choice(categories[category])
-
-        # Generate amount based on category
-        if category == 'Groceries':
-            amount = round(random.uniform(20, 200), 2)
-        elif category == 'Dining':
-            amount = round(random.uniform(10, 100), 2)
-        elif category == 'Transportation':
-            amount = round(random.uniform(15, 150), 2)
-        elif category == 'Shopping':
-            amount = round(random.uniform(25, 300), 2)
-        elif category == 'Entertainment':
-            amount = round(random.uniform(10, 200), 2)
-        elif category == 'Utilities':
-            amount = round(random.uniform(50, 300), 2)
-        elif category == 'Housing':
-            amount = round(random.uniform(500, 3000), 2)
-        elif category == 'Healthcare':
-            amount = round(random.uniform(20, 500), 2)
-
-        transactions.append({
-            'Date': date.strftime('%Y-%m-%d'),
-            'Description': description,
-            'Amount': amount,
-            'Category': category
-        })
-
-    # Create DataFrame
-    df = pd.DataFrame(transactions)
-
-    # Save to CSV
-    df.to_csv('sample_transactions.csv', index=False)
-    print(f"Generated {num_transactions} sample transactions in sample_transactions.csv")
+    offsets = np.repeat(np.arange(date_range + 1), _day_counts(rng, num_transactions, date_range))
+    df = _build_frame(start_date, offsets, *_sample(rng, num_transactions))
+
+    if not save_csv:
+        return df
+
+    # Save to CSV, with pyarrow's multi-threaded writer when available
+    if pa is not None:
+        pacsv.write_csv(_to_arrow(df), path, write_options=pacsv.WriteOptions(batch_size=65536))
+    else:
+        with open(path, 'w', newline='', buffering=CSV_BUFFER_BYTES) as fh:
+            df.to_csv(fh, index=False, date_format='%Y-%m-%d')
+    print(f"Generated {num_transactions} sample transactions in {path}")
     return df
 
+def write_sample_transactions(num_transactions, start_date=None, end_date=None, seed=None,
+                              path='sample_transactions.csv', chunk_size=STREAM_CHUNK_ROWS):
+    """Generate a large sample straight to CSV, one chunk at a time.
+
+    Peak memory is bounded by chunk_size rather than num_transactions. Dates are
+    still sorted across the whole file.
+    """
+    if start_date is None:
+        start_date = datetime.now() - timedelta(days=365)
+    if end_date is None:
+        end_date = datetime.now()
+
+    rng = np.random.default_rng(seed)
+    date_range = (end_date - start_date).days
+    # Row i falls on the first day whose running count exceeds i, so any slice of the
+    # sorted offsets can be found without materializing the rest
+    day_ends = np.cumsum(_day_counts(rng, num_transactions, date_range))
+
+    # Write the header from an empty frame first, so the file exists even with no rows
+    empty = np.empty(0, dtype=np.int64)
+    header_df = _build_frame(start_date, empty, empty, empty, empty)
+    if pa is not None:
+        writer = pacsv.CSVWriter(path, _to_arrow(header_df).schema)
+    else:
+        writer = open(path, 'w', newline='', buffering=CSV_BUFFER_BYTES)
+        header_df.to_csv(writer, index=False)
+    try:
+        for chunk_start in range(0, num_transactions, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, num_transactions)
+            offsets = np.searchsorted(day_ends, np.arange(chunk_start, chunk_stop), side='right')
+            df = _build_frame(start_date, offsets, *_sample(rng, chunk_stop - chunk_start))
+
+            if pa is not None:
+                writer.write_table(_to_arrow(df))
+            else:
+                df.to_csv(writer, header=False, index=False, date_format='%Y-%m-%d')
+    finally:
+        writer.close()
+    print(f"Generated {num_transactions} sample transactions in {path}")
+
 if __name__ == "__main__":
     # Generate transactions for the last year
     end_date = datetime.now()
@@ -99,7 +225,12 @@ if __name__ == "__main__":
 
     # Print some statistics
     print("\nSample Statistics:")
-    print(f"Date Range: {df['Date'].min()} to {df['Date'].max()}")
+    # Dates are generated in order, so the range is just the first and last rows
+    print(f"Date Range: {df['Date'].iat[0]:%Y-%m-%d} to {df['Date'].iat[-1]:%Y-%m-%d}")
+    # Sum exact integer cents (float32 amounts are within a cent of them) so large samples
+    # don't lose the cents; the overall total is summed from the per-category totals
+    cents = (df['Amount'].astype(np.float64) * 100).round().astype(np.int64)
+    by_category = cents.groupby(df['Category'], sort=False, observed=True).sum() / 100
     print("\nTotal Spending by Category:")
-    print(df.groupby('Category')['Amount'].sum().sort_values(ascending=False))
-    print(f"\nTotal Transactions: ${df['Amount'].sum():,.2f}")
\ No newline at end of file
+    print(by_category.sort_values(ascending=False))
+    print(f"\nTotal Transactions: ${by_category.sum():,.2f}")
\ No newline at end of file